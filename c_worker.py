@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Long-lived worker for nnsmith.c_program_gen.
+
+Imports the generator once and then serves generation requests, so that
+c_wrapper.py pays the interpreter and import startup cost once per worker
+instead of once per program. Protocol (one JSON object per line):
+
+    request:  {"overrides": ["mgen.c_program_path=out.c", "mgen.max_nodes=5"]}
+    response: {"ok": true} or {"ok": false, "stderr": "..."}
+
+With --check, only verifies that the generator can be imported and exits
+with status 0 if so.
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import traceback
+
+
+def main():
+    # Responses go to the original stdout; anything the generator itself
+    # prints to stdout is discarded
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, sys.stdout.fileno())
+    os.close(devnull)
+
+    # The repo root holds the nnsmith submodule checkout, which would shadow
+    # the installed package as an empty namespace package
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    sys.path[:] = [p for p in sys.path if os.path.abspath(p or ".") != script_dir]
+
+    # Report an import failure on every request rather than dying silently
+    try:
+        from hydra.core.global_hydra import GlobalHydra
+        from nnsmith.cli.c_program_gen import main as c_program_gen
+
+        import_error = None
+    except Exception:
+        import_error = traceback.format_exc()
+
+    if "--check" in sys.argv[1:]:
+        if import_error is not None:
+            sys.stderr.write(import_error)
+        sys.exit(0 if import_error is None else 1)
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        if import_error is not None:
+            response = {"ok": False, "stderr": import_error}
+            responses.write(json.dumps(response) + "\n")
+            continue
+
+        # c_program_gen is a hydra entry point and parses its overrides from
+        # sys.argv; on failure hydra prints the error and exits
+        sys.argv = ["nnsmith.c_program_gen", *request["overrides"]]
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            try:
+                c_program_gen()
+                ok = True
+            except SystemExit as e:
+                ok = e.code in (None, 0)
+            except Exception:
+                traceback.print_exc()
+                ok = False
+            finally:
+                # Start every request from a clean Hydra global state
+                GlobalHydra.instance().clear()
+
+        response = {"ok": ok}
+        if not ok:
+            response["stderr"] = stderr.getvalue()
+        responses.write(json.dumps(response) + "\n")
+
+
+if __name__ == "__main__":
+    main()
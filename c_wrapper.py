@@ -1,10 +1,22 @@
 import argparse
+import asyncio
+import functools
+import hashlib
+import json
 import os
 import shutil
 import subprocess
 import sys
+import tempfile
+import uuid
 from datetime import datetime
 
+# Generated programs are cached here, keyed by generator arguments
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "torchsyn", "cprog")
+
+# Persistent generator worker, see c_worker.py
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "c_worker.py")
+
 
 def parse_args():
     """Parse command line arguments for the c_program_gen wrapper."""
@@ -57,10 +69,262 @@ def parse_args():
         action="store_true",
         help="Also output a non-inlined version of each generated program (with _noinline suffix)",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        help="Number of programs to generate in parallel (defaults to the number of CPUs)",
+        default=None,
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help=f"Reuse previously generated programs with the same arguments from {CACHE_DIR}",
+    )
+    parser.add_argument(
+        "--no_cache",
+        dest="cache",
+        action="store_false",
+        help="Always invoke the generator (default)",
+    )
     return parser.parse_args()
 
 
-def main():
+def _cache_key(base_cmd, i):
+    """Hash the generator command (minus the output path) and program index.
+
+    The generator is randomized, so the index is part of the key: the i-th
+    program of a rerun reuses the i-th program of the previous run instead of
+    every program collapsing onto the same cache entry.
+    """
+    return hashlib.sha256(repr((sorted(base_cmd), i)).encode()).hexdigest()
+
+
+def _shebang_interpreter(script):
+    """Return the interpreter named in a script's shebang, or None."""
+    with open(script, "rb") as f:
+        shebang = f.readline().decode(errors="replace")
+    if not shebang.startswith("#!"):
+        return None
+    interpreter = shebang[2:].split()
+    # e.g. "#!/usr/bin/env python3"
+    if len(interpreter) > 1 and os.path.basename(interpreter[0]) == "env":
+        return shutil.which(interpreter[1])
+    return interpreter[0] if interpreter else None
+
+
+@functools.lru_cache(maxsize=None)
+def _worker_python():
+    """Find the interpreter to run generator workers with, or None.
+
+    Workers must import nnsmith from the same environment as the
+    nnsmith.c_program_gen console script, which need not be the one running
+    this wrapper, so the script's shebang is preferred (the current
+    interpreter is used if the script is not on PATH). The shebang may name a
+    non-Python wrapper (pyenv shims and Nix wrappers use "#!/usr/bin/env
+    bash"), so the candidate is checked by importing the generator through
+    c_worker.py --check. Returns None if that fails.
+    """
+    script = shutil.which("nnsmith.c_program_gen")
+    python = _shebang_interpreter(script) if script else sys.executable
+    if not python:
+        return None
+    try:
+        result = subprocess.run(
+            [python, WORKER_SCRIPT, "--check"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            timeout=120,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return python if result.returncode == 0 else None
+
+
+async def _spawn_worker():
+    """Start a generator worker that serves requests over its stdin/stdout."""
+    # The worker's own stderr (import errors, interpreter crashes) goes to a
+    # file rather than a pipe, which would block the worker once full as
+    # nothing reads it until the worker dies
+    stderr_log = tempfile.TemporaryFile()
+    worker = await asyncio.create_subprocess_exec(
+        _worker_python(),
+        WORKER_SCRIPT,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=stderr_log,
+        limit=1 << 24,  # responses carry the generator's stderr on failure
+    )
+    worker.stderr_log = stderr_log
+    return worker
+
+
+def _stderr_tail(worker, size=4096):
+    """Return the last size bytes a worker wrote to its stderr and close it."""
+    log = worker.stderr_log
+    log.seek(max(0, log.seek(0, os.SEEK_END) - size))
+    tail = log.read().decode(errors="replace")
+    log.close()
+    return tail
+
+
+async def _run_console_script(cmd):
+    """Run the generator console script for one program. Returns (ok, stderr)."""
+    try:
+        # The generator's stdout is never used; only keep stderr so it can
+        # be reported (and decoded) on failure
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE
+        )
+    except OSError as e:
+        return False, f"cannot run {cmd[0]}: {e}"
+    _, stderr = await proc.communicate()
+    return proc.returncode == 0, stderr.decode(errors="replace")
+
+
+async def _run_generator(workers, cmd):
+    """Run one generator command. Returns (ok, stderr).
+
+    Uses an idle worker, or runs the console script directly if persistent
+    workers are unavailable (workers is None).
+    """
+    if workers is None:
+        return await _run_console_script(cmd)
+
+    worker = await workers.get()
+    request = {"overrides": list(cmd[1:])}
+    try:
+        worker.stdin.write((json.dumps(request) + "\n").encode())
+        await worker.stdin.drain()
+        line = await worker.stdout.readline()
+    except ConnectionError:
+        line = b""
+
+    if not line:
+        # The worker died (e.g. the generator crashed the interpreter);
+        # replace it so later programs can still be generated
+        await worker.wait()
+        workers.put_nowait(await _spawn_worker())
+        return False, (
+            f"generator worker exited with status {worker.returncode}\n"
+            + _stderr_tail(worker)
+        )
+
+    workers.put_nowait(worker)
+    response = json.loads(line)
+    return response["ok"], response.get("stderr", "")
+
+
+async def _generate_one(i, args, base_cmd, output_dir, ts, sem, abort, workers):
+    """Generate a single C program and compile it if requested.
+
+    Returns a tuple of (i, output_file, ok, stderr).
+    """
+    async with sem:
+        # Tasks are skipped rather than cancelled on abort: cancelling a task
+        # while it is spawning its subprocess can hang the event loop
+        if abort.is_set():
+            return i, None, False, None
+
+        # Messages are collected per task and written in one go at the end,
+        # so concurrent tasks neither interleave nor contend on stdout
+        log = []
+        try:
+            return await _generate_and_compile(
+                i, args, base_cmd, output_dir, ts, workers, log
+            )
+        finally:
+            if log:
+                sys.stdout.write("\n".join(log) + "\n")
+
+
+async def _generate_and_compile(i, args, base_cmd, output_dir, ts, workers, log):
+    """Run the generate+compile pipeline for program i, appending to log."""
+    # Append the run timestamp, index and a random tag to the output path;
+    # the tag keeps names unique across runs started in the same second
+    output_file = f"{args.output_path}_{ts}_{i}_{uuid.uuid4().hex[:8]}.c"
+
+    # Only the output path varies between invocations
+    cmd = (base_cmd[0], f"mgen.c_program_path={output_file}", *base_cmd[1:])
+
+    log.append(f"[{i + 1}/{args.generated_nums}] Generating C program: {output_file}")
+    log.append(f"Command: {' '.join(cmd)}")
+
+    noinline_file = output_file.replace(".c", "_noinline.c")
+    if args.cache:
+        key = _cache_key(base_cmd, i)
+        cache_file = os.path.join(CACHE_DIR, f"{key}.c")
+        cache_noinline = os.path.join(CACHE_DIR, f"{key}_noinline.c")
+        cache_hit = os.path.exists(cache_file) and (
+            not args.with_non_inline or os.path.exists(cache_noinline)
+        )
+    else:
+        cache_hit = False
+
+    if cache_hit:
+        try:
+            shutil.copy(cache_file, output_file)
+            if args.with_non_inline:
+                shutil.copy(cache_noinline, noinline_file)
+            log.append(f"✓ Restored from cache: {output_file}")
+        except OSError as e:
+            log.append(f"⚠ Warning: failed to restore {output_file} from cache: {e}")
+            cache_hit = False
+
+    if not cache_hit:
+        ok, stderr = await _run_generator(workers, cmd)
+        if not ok:
+            return i, output_file, False, stderr
+
+        log.append(f"✓ Generated: {output_file}")
+
+        if args.cache:
+            try:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                shutil.copy(output_file, cache_file)
+                if args.with_non_inline:
+                    shutil.copy(noinline_file, cache_noinline)
+            except OSError as e:
+                log.append(f"⚠ Warning: failed to cache {output_file}: {e}")
+
+    # Compile right away so generation and compilation of different
+    # programs overlap
+    if args.compile:
+        await compile_async(output_file, output_dir, log)
+
+    # If non-inlined version was generated, compile it too
+    if args.with_non_inline:
+        log.append(f"  ✓ Non-inlined version: {noinline_file}")
+        if args.compile:
+            await compile_async(noinline_file, output_dir, log)
+
+    return i, output_file, True, None
+
+
+def link_ops_h(ops_h_src, ops_h_dst):
+    """Hard-link ops.h into the output directory, copying across filesystems.
+
+    Returns "linked", "copied" or "up to date".
+    """
+    if os.path.exists(ops_h_dst):
+        src_stat, dst_stat = os.stat(ops_h_src), os.stat(ops_h_dst)
+        # Already linked, or an identical copy from a previous run
+        if os.path.samestat(src_stat, dst_stat) or (
+            src_stat.st_size == dst_stat.st_size
+            and src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+        ):
+            return "up to date"
+        os.remove(ops_h_dst)
+
+    try:
+        os.link(ops_h_src, ops_h_dst)
+        return "linked"
+    except OSError:
+        shutil.copy2(ops_h_src, ops_h_dst)
+        return "copied"
+
+
+async def main_async():
     args = parse_args()
 
     # Determine enable_variants value (--no_variants overrides --enable_variants)
@@ -82,8 +346,11 @@ def main():
         ops_h_dst = "ops.h"
 
     if os.path.exists(ops_h_src):
-        shutil.copy(ops_h_src, ops_h_dst)
-        print(f"✓ Copied ops.h to {ops_h_dst}")
+        status = link_ops_h(ops_h_src, ops_h_dst)
+        if status == "up to date":
+            print(f"✓ ops.h is up to date at {ops_h_dst}")
+        else:
+            print(f"✓ {status.capitalize()} ops.h to {ops_h_dst}")
     else:
         print(f"⚠ Warning: ops.h not found at {ops_h_src}")
 
@@ -93,82 +360,127 @@ def main():
     print(f"  - Output non-inlined version: {args.with_non_inline}")
     print()
 
-    for i in range(args.generated_nums):
-        # Append a unique number to the output path
-        output_file = (
-            f"{args.output_path}_{i}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.c"
+    # Each task runs its own generate+compile pipeline; the semaphore bounds
+    # how many of them are in flight at once
+    sem = asyncio.Semaphore(args.jobs or os.cpu_count())
+    base_cmd = (
+        "nnsmith.c_program_gen",
+        f"mgen.max_nodes={args.max_nodes}",
+        f"mgen.inline_rate={args.inline_rate}",
+        f"mgen.enable_variants={enable_variants}",
+        f"mgen.with_non_inline={args.with_non_inline}",
+    )
+    abort = asyncio.Event()
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    # Generator workers import nnsmith once and are reused for every program,
+    # instead of starting a fresh interpreter per program
+    if _worker_python() is not None:
+        workers = asyncio.Queue()
+        for _ in range(min(args.jobs or os.cpu_count(), args.generated_nums)):
+            workers.put_nowait(await _spawn_worker())
+    else:
+        print(
+            "⚠ Warning: cannot import nnsmith.cli.c_program_gen for persistent "
+            "workers; running nnsmith.c_program_gen once per program"
         )
+        workers = None
 
-        # Build the command to execute
-        cmd = [
-            "nnsmith.c_program_gen",
-            f"mgen.c_program_path={output_file}",
-            f"mgen.max_nodes={args.max_nodes}",
-            f"mgen.inline_rate={args.inline_rate}",
-            f"mgen.enable_variants={enable_variants}",
-            f"mgen.with_non_inline={args.with_non_inline}",
-        ]
+    tasks = [
+        asyncio.create_task(
+            _generate_one(i, args, base_cmd, output_dir, ts, sem, abort, workers)
+        )
+        for i in range(args.generated_nums)
+    ]
 
-        # Execute the command
-        print(f"[{i + 1}/{args.generated_nums}] Generating C program: {output_file}")
-        print(f"Command: {' '.join(cmd)}")
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            i, output_file, ok, stderr = await next_done
+            if ok:
+                continue
 
-        try:
-            subprocess.run(cmd, check=True, capture_output=True, text=True)
-            print(f"✓ Generated: {output_file}")
+            print(f"✗ Error running c_program_gen for {output_file}")
+            print(f"STDERR: {stderr}")
+            # Bail out if the very first program fails; it is most likely a
+            # setup problem that every other invocation will hit as well
+            if i == 0:
+                abort.set()
+                await asyncio.gather(*tasks)
+                sys.exit(1)
+    finally:
+        # Closing stdin ends the worker's request loop
+        while workers is not None and not workers.empty():
+            worker = workers.get_nowait()
+            worker.stdin.close()
+            await worker.wait()
+            worker.stderr_log.close()
 
-            # Compile if requested
-            if args.compile:
-                compile_c_program(output_file, output_dir)
 
-            # If non-inlined version was generated, compile it too
-            if args.with_non_inline:
-                noinline_file = output_file.replace(".c", "_noinline.c")
-                print(f"  ✓ Non-inlined version: {noinline_file}")
-                if args.compile:
-                    compile_c_program(noinline_file, output_dir)
-
-        except subprocess.CalledProcessError as e:
-            print(f"✗ Error running c_program_gen: {e}")
-            print(f"STDERR: {e.stderr}")
-            if i > 0:  # Continue if we've already generated some programs
-                continue
-            else:
-                sys.exit(1)
+def main():
+    asyncio.run(main_async())
 
 
-def compile_c_program(c_file_path, include_dir=None):
-    """Compile the generated C program."""
-    try:
-        # Create output filename
-        output_path = c_file_path.replace(".c", "")
+async def compile_async(c_file_path, include_dir=None, log=None):
+    """Compile the generated C program.
 
-        # Build compile command with include path for ops.h
-        cmd = ["gcc", "-O2", "-Wall", "-std=c99"]
+    Messages are appended to `log` if given, otherwise printed directly.
+    """
+    emit = print if log is None else log.append
 
-        # Add include path if specified
-        if include_dir:
-            cmd.extend(["-I", include_dir])
+    # Create output filename
+    output_path = c_file_path.replace(".c", "")
 
-        cmd.extend(["-o", output_path, c_file_path, "-lm"])
+    # Build compile command with include path for ops.h
+    cmd = ["gcc", "-O3", "-march=native", "-pipe", "-fno-plt", "-Wall", "-std=c99"]
 
-        print(f"  Compiling: {' '.join(cmd)}")
-        subprocess.run(cmd, check=True, capture_output=True, text=True)
-        print(f"  ✓ Compiled: {output_path}")
+    # Route through ccache when available; generated programs share large
+    # amounts of identical code (ops.h and common operator bodies)
+    env = None
+    if shutil.which("ccache"):
+        cmd.insert(0, "ccache")
+        # Rewrite absolute paths under the output directory so hits do not
+        # depend on where the programs were generated
+        env = dict(os.environ)
+        env.setdefault("CCACHE_BASEDIR", os.path.abspath(include_dir or "."))
 
-        # Test run with basic arguments
-        test_cmd = [output_path]
-        try:
-            result = subprocess.run(test_cmd, timeout=5, capture_output=True, text=True)
-            print(f"  ✓ Test run successful")
-        except subprocess.TimeoutExpired:
-            print(f"  ⚠ Test run timed out (expected for large models)")
-        except subprocess.CalledProcessError as e:
-            print(f"  ⚠ Test run failed: {e}")
-
-    except subprocess.CalledProcessError as e:
-        print(f"  ✗ Compilation failed: {e}")
-        print(f"  STDERR: {e.stderr}")
+    # Add include path if specified
+    if include_dir:
+        cmd.extend(["-I", include_dir])
+
+    cmd.extend(["-o", output_path, c_file_path, "-lm"])
+
+    emit(f"  Compiling: {' '.join(cmd)}")
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+        env=env,
+    )
+    _, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        emit(f"  ✗ Compilation failed: gcc exited with status {proc.returncode}")
+        emit(f"  STDERR: {stderr.decode(errors='replace')}")
+        return
+    emit(f"  ✓ Compiled: {output_path}")
+
+    # Test run with basic arguments
+    proc = await asyncio.create_subprocess_exec(
+        output_path,
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.DEVNULL,
+    )
+    try:
+        await asyncio.wait_for(proc.wait(), timeout=5)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        emit(f"  ⚠ Test run timed out (expected for large models)")
+        return
+
+    if proc.returncode != 0:
+        emit(f"  ⚠ Test run failed: exit status {proc.returncode}")
+    else:
+        emit(f"  ✓ Test run successful")
 
 
 if __name__ == "__main__":
@@ -5,68 +5,198 @@ Output formats: JSON, JSONL (for Hugging Face datasets), and Parquet.
 """
 
 import argparse
+import asyncio
 import json
 import os
-import glob
+import pickle
 from datetime import datetime
 
+try:
+    import orjson
 
-def find_program_pairs(generated_dir: str):
-    """Find pairs of inline and non-inline programs."""
-    pairs = []
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+except ImportError:
 
-    # Find all non-inline files
-    noinline_files = glob.glob(os.path.join(generated_dir, "*_noinline.c"))
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode("utf-8")
 
-    for noinline_path in noinline_files:
-        # Find corresponding inline file
-        inline_path = noinline_path.replace("_noinline.c", ".c")
 
-        if os.path.exists(inline_path):
-            pairs.append({"inline_path": inline_path, "noinline_path": noinline_path})
+# Dataset columns holding full program sources
+CODE_COLUMNS = ("before", "after")
 
-    return pairs
+# Upper bound on files being read concurrently (keeps open FDs bounded)
+MAX_CONCURRENT_READS = 256
 
 
-def read_file(path: str) -> str:
-    """Read file contents."""
-    with open(path, "r") as f:
+def find_program_pairs(generated_dir: str):
+    """Find pairs of inline and non-inline programs."""
+    # Bucket all C files by their base name in a single directory pass
+    inline, noinline = {}, {}
+    if not os.path.isdir(generated_dir):
+        return []
+    with os.scandir(generated_dir) as it:
+        for entry in it:
+            name = entry.name
+            if not name.endswith(".c"):
+                continue
+            if name.endswith("_noinline.c"):
+                noinline[name[: -len("_noinline.c")]] = entry.path
+            else:
+                inline[name[:-2]] = entry.path
+
+    return [
+        {"inline_path": inline[base], "noinline_path": noinline_path}
+        for base, noinline_path in noinline.items()
+        if base in inline
+    ]
+
+
+def read_file(path: str) -> bytes:
+    """Read raw file contents."""
+    with open(path, "rb") as f:
         return f.read()
 
 
-def create_dataset_entry(inline_path: str, noinline_path: str, idx: int) -> dict:
-    """Create a single dataset entry from a pair of files.
+async def read_program_pair(
+    inline_path: str, noinline_path: str, sem: asyncio.Semaphore
+) -> tuple:
+    """Read the (after, before) sources of a pair concurrently, as bytes."""
+    async with sem:
+        return await asyncio.gather(
+            asyncio.to_thread(read_file, inline_path),  # inlined version = after
+            asyncio.to_thread(read_file, noinline_path),  # non-inlined = before
+        )
+
 
-    - before: non-inlined version (original function calls)
-    - after: inlined version (code expanded in model_forward)
+def count_code_stats(before_codes: list, after_codes: list) -> dict:
+    """Count lines and markers across a batch of program sources (bytes).
+
+    Returns a dict mapping each stat column to one count per program. With
+    pyarrow installed, each count is a single vectorized pass over the batch.
     """
-    after_code = read_file(inline_path)  # inlined version = after
-    before_code = read_file(noinline_path)  # non-inlined version = before
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        before = pa.array(before_codes, type=pa.large_binary())
+        after = pa.array(after_codes, type=pa.large_binary())
 
-    # Extract some metadata
-    after_lines = after_code.count("\n")
-    before_lines = before_code.count("\n")
+        def count(codes, pattern: bytes) -> list:
+            return pc.count_substring(codes, pattern).to_pylist()
+
+    except ImportError:
+        before, after = before_codes, after_codes
+
+        def count(codes, pattern: bytes) -> list:
+            return [code.count(pattern) for code in codes]
+
+    return {
+        "before_lines": count(before, b"\n"),
+        "after_lines": count(after, b"\n"),
+        # Inlined operations are marked with /* INLINED */
+        "inlined_ops_count": count(after, b"/* INLINED */"),
+        "variant_count": count(after, b"/* variant"),
+    }
 
-    # Count inlined operations (marked with /* INLINED */)
-    inlined_count = after_code.count("/* INLINED */")
 
-    # Count variant uses
-    variant_count = after_code.count("/* variant")
+def create_dataset_entry(
+    inline_path: str, idx: int, after_bytes: bytes, before_bytes: bytes, stats: dict
+) -> dict:
+    """Create a single dataset entry from the sources of a pair.
 
+    - before: non-inlined version (original function calls)
+    - after: inlined version (code expanded in model_forward)
+
+    `stats` holds this pair's counts as produced by count_code_stats.
+    """
     return {
         "id": idx,
         "filename": os.path.basename(inline_path),
-        "before": before_code,
-        "after": after_code,
-        "before_lines": before_lines,
-        "after_lines": after_lines,
-        "inlined_ops_count": inlined_count,
-        "variant_count": variant_count,
-        "line_diff": after_lines - before_lines,
+        "before": before_bytes.decode("utf-8"),
+        "after": after_bytes.decode("utf-8"),
+        "before_lines": stats["before_lines"],
+        "after_lines": stats["after_lines"],
+        "inlined_ops_count": stats["inlined_ops_count"],
+        "variant_count": stats["variant_count"],
+        "line_diff": stats["after_lines"] - stats["before_lines"],
         "created_at": datetime.now().isoformat(),
     }
 
 
+def entry_cache_key(inline_path: str, noinline_path: str) -> tuple:
+    """Key a pair by its paths plus the mtime and size of both files."""
+    inline_stat = os.stat(inline_path)
+    noinline_stat = os.stat(noinline_path)
+    return (
+        inline_path,
+        noinline_path,
+        inline_stat.st_mtime_ns,
+        noinline_stat.st_mtime_ns,
+        inline_stat.st_size,
+        noinline_stat.st_size,
+    )
+
+
+def load_entry_cache(path: str) -> dict:
+    """Load memoized dataset entries; an unreadable cache is treated as empty."""
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return {}
+
+
+def save_entry_cache(cache: dict, path: str):
+    """Persist memoized dataset entries."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+async def create_dataset_entries(pairs: list, cache: dict = None) -> tuple:
+    """Create dataset entries for all pairs, overlapping their file reads.
+
+    Entries found in `cache` are reused instead of being re-read. Returns the
+    dataset and a cache holding exactly the entries of the current pairs.
+    """
+    cache = cache or {}
+    sem = asyncio.Semaphore(MAX_CONCURRENT_READS)
+
+    keys = [entry_cache_key(p["inline_path"], p["noinline_path"]) for p in pairs]
+    missing = [idx for idx, key in enumerate(keys) if key not in cache]
+    sources = await asyncio.gather(
+        *(
+            read_program_pair(
+                pairs[idx]["inline_path"], pairs[idx]["noinline_path"], sem
+            )
+            for idx in missing
+        )
+    )
+
+    # Count lines and markers for all new programs in one batch
+    stats = count_code_stats(
+        [before for _, before in sources], [after for after, _ in sources]
+    )
+    new_entries = {
+        idx: create_dataset_entry(
+            pairs[idx]["inline_path"],
+            idx,
+            after,
+            before,
+            {name: counts[row] for name, counts in stats.items()},
+        )
+        for row, (idx, (after, before)) in enumerate(zip(missing, sources))
+    }
+
+    dataset = [
+        new_entries[idx] if idx in new_entries else {**cache[key], "id": idx}
+        for idx, key in enumerate(keys)
+    ]
+    return dataset, dict(zip(keys, dataset))
+
+
 def save_json(data: list, output_path: str):
     """Save dataset as JSON."""
     with open(output_path, "w") as f:
@@ -76,22 +206,37 @@ def save_json(data: list, output_path: str):
 
 def save_jsonl(data: list, output_path: str):
     """Save dataset as JSONL (one JSON per line, for Hugging Face datasets)."""
-    with open(output_path, "w") as f:
+    with open(output_path, "wb", buffering=1 << 20) as f:
         for entry in data:
-            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.write(_dumps(entry))
+            f.write(b"\n")
     print(f"✓ Saved JSONL dataset: {output_path}")
 
 
 def save_parquet(data: list, output_path: str):
-    """Save dataset as Parquet (requires pandas and pyarrow)."""
+    """Save dataset as Parquet (requires pyarrow)."""
     try:
-        import pandas as pd
-
-        df = pd.DataFrame(data)
-        df.to_parquet(output_path, index=False)
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        # Build the table column by column; the code columns use large_string
+        # (64-bit offsets) so a corpus of big C files cannot overflow the
+        # 2 GiB per-array limit of a regular string column
+        names = list(data[0]) if data else []
+        table = pa.Table.from_arrays(
+            [
+                pa.array(
+                    [entry[name] for entry in data],
+                    type=pa.large_string() if name in CODE_COLUMNS else None,
+                )
+                for name in names
+            ],
+            names=names,
+        )
+        pq.write_table(table, output_path, compression="zstd")
         print(f"✓ Saved Parquet dataset: {output_path}")
     except ImportError:
-        print("⚠ Parquet export requires pandas and pyarrow. Skipping.")
+        print("⚠ Parquet export requires pyarrow. Skipping.")
 
 
 def main():
@@ -118,6 +263,11 @@ def main():
         choices=["json", "jsonl", "parquet"],
         help="Output formats",
     )
+    parser.add_argument(
+        "--no_cache",
+        action="store_true",
+        help="Recompute every entry instead of reusing ones memoized in <input_dir>/.cache",
+    )
     args = parser.parse_args()
 
     # Find program pairs
@@ -130,11 +280,14 @@ def main():
 
     print(f"Found {len(pairs)} program pair(s)")
 
-    # Create dataset entries
-    dataset = []
-    for idx, pair in enumerate(pairs):
-        entry = create_dataset_entry(pair["inline_path"], pair["noinline_path"], idx)
-        dataset.append(entry)
+    # Create dataset entries, reusing those whose files have not changed
+    cache_path = os.path.join(args.input_dir, ".cache", "entries.pkl")
+    cache = {} if args.no_cache else load_entry_cache(cache_path)
+    dataset, cache = asyncio.run(create_dataset_entries(pairs, cache))
+    if not args.no_cache:
+        save_entry_cache(cache, cache_path)
+
+    for idx, entry in enumerate(dataset):
         print(f"  [{idx+1}/{len(pairs)}] {entry['filename']}")
         print(
             f"    - Before: {entry['before_lines']} lines, After: {entry['after_lines']} lines (+{entry['line_diff']})"
@@ -5,8 +5,19 @@ Provides a terminal-based side-by-side comparison.
 """
 
 import argparse
+import itertools
 import json
 import os
+import re
+
+# An inlined section starts at a line containing the /* INLINED */ marker and
+# extends over the following non-blank lines, stopping before a comment line
+# or a line that allocates memory (malloc)
+_INLINED_SECTION_RE = re.compile(
+    r"^[^\n]*/\* INLINED \*/[^\n]*"
+    r"(?:\n(?![^\S\n]*(?://|/\*|$))(?![^\n]*malloc)[^\n]*)*",
+    re.MULTILINE,
+)
 
 
 def load_dataset(path: str) -> list:
@@ -22,15 +33,42 @@ def load_dataset(path: str) -> list:
             return json.load(f)
 
 
+def load_entry(path: str, index: int):
+    """Load a single entry by index without materializing the whole dataset.
+
+    Returns None if the index is out of range.
+    """
+    if index < 0:
+        return None
+
+    if path.endswith(".jsonl"):
+        # Skip over preceding lines without parsing them
+        with open(path, "r") as f:
+            line = next(itertools.islice(f, index, None), None)
+        return json.loads(line) if line is not None else None
+
+    try:
+        import ijson
+    except ImportError:
+        data = load_dataset(path)
+        return data[index] if index < len(data) else None
+
+    # Stream the top-level array so only the requested object is built
+    with open(path, "rb") as f:
+        items = ijson.items(f, "item", use_float=True)
+        return next(itertools.islice(items, index, None), None)
+
+
 def truncate_code(code: str, max_lines: int = 50) -> str:
     """Truncate code to max_lines for display."""
-    lines = code.split("\n")
-    if len(lines) > max_lines:
-        return (
-            "\n".join(lines[:max_lines])
-            + f"\n\n... ({len(lines) - max_lines} more lines)"
-        )
-    return code
+    # Locate the end of line max_lines without splitting the whole file
+    idx = -1
+    for _ in range(max_lines):
+        idx = code.find("\n", idx + 1)
+        if idx == -1:
+            return code
+    remaining = code.count("\n", idx + 1) + 1
+    return code[: max(idx, 0)] + f"\n\n... ({remaining} more lines)"
 
 
 def display_entry(entry: dict, show_full: bool = False):
@@ -70,28 +108,11 @@ def display_entry(entry: dict, show_full: bool = False):
 def find_inlined_sections(code: str) -> list:
     """Find and extract inlined code sections."""
     sections = []
-    lines = code.split("\n")
-
-    i = 0
-    while i < len(lines):
-        if "/* INLINED */" in lines[i]:
-            start = i
-            # Find the end of this inlined section (next allocation or function call)
-            end = i + 1
-            while (
-                end < len(lines)
-                and not lines[end].strip().startswith("//")
-                and not "malloc" in lines[end]
-            ):
-                if lines[end].strip() and not lines[end].strip().startswith("/*"):
-                    end += 1
-                else:
-                    break
-            sections.append({"line": start + 1, "code": "\n".join(lines[start:end])})
-            i = end
-        else:
-            i += 1
-
+    line, pos = 1, 0
+    for m in _INLINED_SECTION_RE.finditer(code):
+        line += code.count("\n", pos, m.start())
+        pos = m.start()
+        sections.append({"line": line, "code": m.group(0)})
     return sections
 
 
@@ -179,19 +200,25 @@ def main():
             print("Run create_dataset.py first to generate the dataset.")
             return
 
+    if args.entry is not None and not args.interactive:
+        entry = load_entry(args.dataset, args.entry)
+        if entry is None:
+            dataset = load_dataset(args.dataset)
+            print(f"Invalid entry index. Valid range: 0-{len(dataset)-1}")
+            return
+
+        print(f"Loaded entry {args.entry} from {args.dataset}")
+        if args.inlined:
+            show_inlined_diff(entry)
+        else:
+            display_entry(entry, show_full=args.full)
+        return
+
     dataset = load_dataset(args.dataset)
     print(f"Loaded {len(dataset)} entries from {args.dataset}")
 
     if args.interactive:
         interactive_mode(dataset)
-    elif args.entry is not None:
-        if 0 <= args.entry < len(dataset):
-            if args.inlined:
-                show_inlined_diff(dataset[args.entry])
-            else:
-                display_entry(dataset[args.entry], show_full=args.full)
-        else:
-            print(f"Invalid entry index. Valid range: 0-{len(dataset)-1}")
     else:
         # Show all entries (summary)
         for entry in dataset:
@@ -1,7 +1,9 @@
 import argparse
+import os
 import subprocess
 import sys
-import argparse
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 
@@ -23,32 +25,51 @@ def parse_args():
         help="Number of programs to generate",
         default=100,
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        help="Number of programs to generate in parallel (defaults to the number of CPUs)",
+        default=None,
+    )
     return parser.parse_args()
 
 
-def main():
-    args = parse_args()
+def _generate_one(i, args, ts):
+    """Generate a single program. Returns a tuple of (output_file, ok, error)."""
+    # Append the run timestamp, index and a random tag to the output path;
+    # the tag keeps names unique across runs started in the same second
+    output_file = f"{args.output_path}_{ts}_{i}_{uuid.uuid4().hex[:8]}.py"
 
-    for i in range(args.generated_nums):
-        # Append a unique number to the output path
-        output_file = (
-            f"{args.output_path}_{i}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.py"
-        )
+    # Build the command to execute
+    cmd = [
+        "nnsmith.torch_program_gen",
+        f"mgen.torch_program_path={output_file}",
+    ]
+
+    # Execute the command
+    print(f"[{i + 1}/{args.generated_nums}] Executing: {' '.join(cmd)}")
+
+    try:
+        subprocess.run(cmd, check=True)
+    except subprocess.CalledProcessError as e:
+        return output_file, False, e
+    return output_file, True, None
 
-        # Build the command to execute
-        cmd = [
-            "nnsmith.torch_program_gen",
-            f"mgen.torch_program_path={output_file}",
-        ]
 
-        # Execute the command
-        print(f"[{i + 1}/{args.generated_nums}] Executing: {' '.join(cmd)}")
+def main():
+    args = parse_args()
 
-        try:
-            subprocess.run(cmd, check=True)
-        except subprocess.CalledProcessError as e:
-            print(f"Error running torch_program_gen: {e}")
-            sys.exit(1)
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
+    with ThreadPoolExecutor(max_workers=args.jobs or os.cpu_count()) as ex:
+        futures = [
+            ex.submit(_generate_one, i, args, ts) for i in range(args.generated_nums)
+        ]
+        for future in as_completed(futures):
+            output_file, ok, error = future.result()
+            if not ok:
+                print(f"Error running torch_program_gen: {error}")
+                ex.shutdown(cancel_futures=True)
+                sys.exit(1)
 
 
 if __name__ == "__main__":